@@ -8,15 +8,27 @@ Target Markets: Vietnam, Saudi Arabia
 Target Brand: Lancôme
 """
 
+import os
+import re
 import time
 import csv
 import json
 import random
+import asyncio
+import hashlib
 import logging
+import operator
+import shutil
+import sys
+import unicodedata
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urljoin, quote
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 
 import requests
 from selenium import webdriver
@@ -24,8 +36,13 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import (
+    TimeoutException, NoSuchElementException, InvalidSessionIdException, NoSuchWindowException
+)
+from selectolax.parser import HTMLParser
+from urllib3.exceptions import MaxRetryError, ProtocolError
+
+from config import ScrapingConfig
 
 
 @dataclass
@@ -43,6 +60,12 @@ class ProductInfo:
 @dataclass
 class ReviewInfo:
     """Data class for review information"""
+    __slots__ = (
+        'product_url', 'product_name', 'reviewer_name', 'rating',
+        'review_text', 'review_date', 'verified_purchase',
+        'helpful_votes', 'review_id', 'country_market', 'scrape_timestamp'
+    )
+    
     product_url: str
     product_name: str
     reviewer_name: str
@@ -56,15 +79,228 @@ class ReviewInfo:
     scrape_timestamp: str
 
 
+CSV_FIELDNAMES = [
+    'product_url', 'product_name', 'reviewer_name', 'rating',
+    'review_text', 'review_date', 'verified_purchase',
+    'helpful_votes', 'review_id', 'country_market', 'scrape_timestamp'
+]
+
+# Reviewer names, ratings, dates and vote counts repeat across thousands of
+# reviews, so short values are interned to share one string object
+INTERN_MAX_LENGTH = 64
+
+
+def intern_short(value: str) -> str:
+    """Intern value if it is short enough to be likely repeated"""
+    return sys.intern(value) if len(value) < INTERN_MAX_LENGTH else value
+
+
+class ReviewCsvWriter:
+    """Writes reviews to a CSV file batch by batch as products finish"""
+    
+    def __init__(self, filename: str, fsync_every: int = 10):
+        self.file = open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(CSV_FIELDNAMES)
+        # Read the columns straight off each dataclass, asdict() deep-copies every row
+        self.row = operator.attrgetter(*CSV_FIELDNAMES)
+        self.fsync_every = fsync_every
+        self.batches = 0
+        self.count = 0
+        
+    def write(self, reviews: List[ReviewInfo]):
+        """Append a batch of reviews, syncing to disk every few batches"""
+        self.writer.writerows(self.row(review) for review in reviews)
+        self.count += len(reviews)
+        self.batches += 1
+        if self.batches % self.fsync_every == 0:
+            self.sync()
+            
+    def sync(self):
+        """Flush buffered rows so they survive a crash"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        
+    def close(self):
+        """Sync and close the file"""
+        self.sync()
+        self.file.close()
+        
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DriverPool:
+    """Fixed-size pool of reusable Chrome drivers shared by scraping coroutines"""
+    
+    def __init__(self, scraper: 'TikTokShopScraper', size: int):
+        self.scraper = scraper
+        self.size = size
+        self.semaphore = asyncio.Semaphore(size)
+        self.executor = ThreadPoolExecutor(max_workers=size)
+        self.idle: Dict[str, deque] = {}
+        self.drivers: List[webdriver.Chrome] = []
+        # Places taken by live drivers, including ones still launching or quitting
+        self.places = 0
+        self.place_changed = asyncio.Event()
+        # Chrome locks its profile directory, so live drivers of a market need distinct slots
+        self.profile_slots: Dict[str, set] = {}
+        self.driver_slots: Dict[webdriver.Chrome, tuple] = {}
+        
+    async def run(self, func, *args):
+        """Run a blocking Selenium call on the pool's worker threads"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+        
+    @asynccontextmanager
+    async def acquire(self, market: str):
+        """Borrow an idle driver for a market, creating one while under the pool size"""
+        async with self.semaphore:
+            driver = await self.checkout(market)
+            try:
+                yield driver
+            except BaseException as e:
+                if self.is_driver_failure(e):
+                    # The browser crashed or lost its session, start a fresh one next time
+                    try:
+                        await self.quit_driver(driver)
+                    except Exception as quit_error:
+                        self.scraper.logger.debug(f"Failed to quit driver: {quit_error}")
+                else:
+                    self.release(market, driver)
+                raise
+            else:
+                self.release(market, driver)
+                
+    @staticmethod
+    def is_driver_failure(error: BaseException) -> bool:
+        """Whether an error means the browser session is gone, rather than a page-level problem"""
+        return isinstance(error, (
+            InvalidSessionIdException, NoSuchWindowException, MaxRetryError, ProtocolError, ConnectionError
+        ))
+                
+    def release(self, market: str, driver: webdriver.Chrome):
+        """Return a driver to its market's idle queue"""
+        self.idle.setdefault(market, deque()).append(driver)
+        self.place_changed.set()
+        
+    async def checkout(self, market: str) -> webdriver.Chrome:
+        """Take an idle driver of the market, or launch one once a place is free"""
+        idle = self.idle.setdefault(market, deque())
+        while True:
+            if idle:
+                return idle.popleft()
+            if self.places < self.size:
+                return await self.launch(market)
+                
+            # Full: quit another market's idle driver and take over its place
+            other = next((queue for queue in self.idle.values() if queue), None)
+            if other is not None:
+                try:
+                    await self.quit_driver(other.pop(), free_place=False)
+                except Exception as e:
+                    # Its slot is freed either way and the place is still reserved for us
+                    self.scraper.logger.debug(f"Failed to quit driver: {e}")
+                except BaseException:
+                    self.free_place()
+                    raise
+                return await self.launch(market, reserved=True)
+                
+            # Every place is busy launching, quitting or in use, wait for one to change
+            self.place_changed.clear()
+            await self.place_changed.wait()
+            
+    async def launch(self, market: str, reserved: bool = False) -> webdriver.Chrome:
+        """Start a driver on the lowest free profile slot of a market"""
+        if not reserved:
+            self.places += 1
+            
+        used_slots = self.profile_slots.setdefault(market, set())
+        slot = 0
+        while slot in used_slots:
+            slot += 1
+        used_slots.add(slot)
+        
+        try:
+            driver = await self.run(self.scraper.setup_driver, market, slot)
+        except BaseException:
+            used_slots.discard(slot)
+            self.free_place()
+            raise
+            
+        self.drivers.append(driver)
+        self.driver_slots[driver] = (market, slot)
+        return driver
+        
+    async def quit_driver(self, driver: webdriver.Chrome, free_place: bool = True):
+        """Quit a driver and free its profile slot, and its place once Chrome has exited"""
+        self.drivers.remove(driver)
+        market, slot = self.driver_slots.pop(driver)
+        try:
+            await self.run(driver.quit)
+        finally:
+            self.profile_slots[market].discard(slot)
+            if free_place:
+                self.free_place()
+                
+    def free_place(self):
+        """Give back a place and wake acquirers waiting for one"""
+        self.places -= 1
+        self.place_changed.set()
+        
+    async def start(self, markets: List[str]):
+        """Start one driver per market up front so the first page load does not wait on Chrome"""
+        markets = markets[:self.size - self.places]
+        drivers = await asyncio.gather(
+            *[self.launch(market) for market in markets],
+            return_exceptions=True
+        )
+        for market, driver in zip(markets, drivers):
+            if isinstance(driver, Exception):
+                # acquire() retries the launch later and surfaces the error to the market task
+                continue
+            self.release(market, driver)
+            
+    async def close(self):
+        """Quit every driver and stop the worker threads"""
+        for driver in list(self.drivers):
+            try:
+                await self.quit_driver(driver)
+            except Exception as e:
+                self.scraper.logger.debug(f"Failed to quit driver: {e}")
+                
+        self.idle.clear()
+        self.executor.shutdown(wait=True)
+
+
 class TikTokShopScraper:
     """Main scraper class for TikTok Shop reviews"""
     
-    def __init__(self, headless: bool = True, proxy: Optional[str] = None):
+    # Subresources and third-party trackers that are never needed for scraping text.
+    # The shop itself is a JavaScript app, so its own scripts must keep loading.
+    BLOCKED_URL_PATTERNS = [
+        '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg',
+        '*.mp4', '*.webm', '*.woff', '*.woff2', '*.ttf', '*.css',
+        '*google-analytics*', '*googletagmanager*', '*facebook.net*',
+        '*doubleclick*', '*hotjar*'
+    ]
+    
+    # XHR endpoint the product page uses to page through reviews
+    REVIEW_API_PATH = '/api/v1/review/list'
+    REVIEW_API_PAGE_SIZE = 20
+    
+    def __init__(self, headless: bool = True, proxy: Optional[str] = None, max_workers: int = 4):
         self.setup_logging()
         self.markets = {
             'vietnam': 'vn',
             'saudi_arabia': 'sa'
         }
+        self.market_urls = {
+            market: f"https://shop.tiktok.com/{code}" for market, code in self.markets.items()
+        }
         self.user_agents = [
             'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -72,8 +308,14 @@ class TikTokShopScraper:
         ]
         self.headless = headless
         self.proxy = proxy
+        self.max_workers = max_workers
         self.session = requests.Session()
-        self.driver = None
+        self.pool: Optional[DriverPool] = None
+        # One comma-joined query per selector list, so a lookup is a single select
+        self.selectors = {
+            key: ', '.join(candidates) for key, candidates in ScrapingConfig.SELECTORS.items()
+        }
+        self.review_id_hashers: Dict[str, hashlib.blake2b] = {}
         
     def setup_logging(self):
         """Setup logging configuration"""
@@ -87,7 +329,7 @@ class TikTokShopScraper:
         )
         self.logger = logging.getLogger(__name__)
         
-    def setup_driver(self, market: str) -> webdriver.Chrome:
+    def setup_driver(self, market: str, profile_slot: int = 0) -> webdriver.Chrome:
         """Setup Chrome driver with appropriate options"""
         options = Options()
         
@@ -100,6 +342,13 @@ class TikTokShopScraper:
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
         options.add_argument(f'--user-agent={random.choice(self.user_agents)}')
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        
+        # Persistent profile per market and slot keeps the HTTP cache across products and runs
+        profile_dir = os.path.join(ScrapingConfig.PROFILE_DIR, f"{market}-{profile_slot}")
+        os.makedirs(profile_dir, exist_ok=True)
+        options.add_argument(f'--user-data-dir={profile_dir}')
+        options.add_argument(f'--disk-cache-size={ScrapingConfig.DISK_CACHE_SIZE}')
         
         # Add proxy if provided
         if self.proxy:
@@ -114,29 +363,65 @@ class TikTokShopScraper:
         try:
             driver = webdriver.Chrome(options=options)
             driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.widen_connection_pool(driver)
+            self.block_heavy_resources(driver)
             return driver
         except Exception as e:
             self.logger.error(f"Failed to setup driver: {e}")
             raise
             
+    def block_heavy_resources(self, driver: webdriver.Chrome):
+        """Block images, media, fonts and stylesheets at the network layer"""
+        # --disable-images is ignored by recent Chrome builds, DevTools blocking is not
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.BLOCKED_URL_PATTERNS})
+        
+    def widen_connection_pool(self, driver: webdriver.Chrome):
+        """Let concurrent commands to chromedriver use parallel keep-alive connections"""
+        # Selenium's urllib3 PoolManager keeps a single connection per host, so
+        # commands issued from several threads queue behind each other
+        connection_manager = getattr(driver.command_executor, '_conn', None)
+        if connection_manager is None:
+            return
+        connection_manager.connection_pool_kw['maxsize'] = max(self.max_workers, 10)
+        connection_manager.clear()
+        
     def random_delay(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
         """Add random delay to avoid being detected as bot"""
         delay = random.uniform(min_seconds, max_seconds)
         time.sleep(delay)
         
+    async def random_delay_async(self, min_seconds: float = 1.0, max_seconds: float = 3.0):
+        """Add random delay without blocking the event loop"""
+        await asyncio.sleep(random.uniform(min_seconds, max_seconds))
+        
     def get_tiktok_shop_url(self, market: str) -> str:
         """Get TikTok Shop URL for specific market"""
-        market_code = self.markets.get(market)
-        if not market_code:
-            raise ValueError(f"Unsupported market: {market}")
-        return f"https://shop.tiktok.com/{market_code}"
+        try:
+            return self.market_urls[market]
+        except KeyError:
+            raise ValueError(f"Unsupported market: {market}") from None
         
-    def search_lancome_products(self, market: str) -> List[ProductInfo]:
+    async def search_lancome_products(self, market: str) -> List[ProductInfo]:
         """Search for Lancôme products in specified market"""
         self.logger.info(f"Searching for Lancôme products in {market}")
         
-        self.driver = self.setup_driver(market)
+        async with self.pool.acquire(market) as driver:
+            products, product_urls = await self.pool.run(self._search_products, market, driver)
+            
+        if not products and product_urls:
+            products = await self.parse_products_from_source(market, product_urls)
+            
+        return products
+        
+    def _search_products(self, market: str, driver: webdriver.Chrome) -> Tuple[List[ProductInfo], List[str]]:
+        """Blocking part of the product search, run on a pool worker thread
+        
+        Returns the products found on the search page, or when no product cards
+        rendered, the product URLs linked from it for the fallback to visit.
+        """
         products = []
+        product_urls = []
         
         try:
             base_url = self.get_tiktok_shop_url(market)
@@ -145,30 +430,28 @@ class TikTokShopScraper:
             search_url = f"{base_url}/search?q={quote('lancome')}"
             self.logger.info(f"Accessing search URL: {search_url}")
             
-            self.driver.get(search_url)
-            self.random_delay(3, 5)
+            self.random_delay(0.2, 0.6)
+            driver.get(search_url)
             
             # Wait for page to load
             try:
-                WebDriverWait(self.driver, 10).until(
+                WebDriverWait(driver, 10).until(
                     EC.presence_of_element_located((By.CLASS_NAME, "product-card"))
                 )
             except TimeoutException:
                 self.logger.warning("Product cards not found, trying alternative selectors")
                 
-            # Try multiple selectors for product cards
-            product_selectors = [
-                ".product-card",
-                "[data-testid*='product']",
-                ".item-card",
-                ".goods-card",
-                "a[href*='/product/']"
-            ]
+            # Try multiple selectors for product cards, one at a time since
+            # cards and the product links inside them would both match a joined query
+            product_selectors = ScrapingConfig.SELECTORS['product_cards']
+            
+            # Parse the rendered page locally instead of querying the driver per element
+            tree = HTMLParser(driver.page_source)
             
             product_elements = []
             for selector in product_selectors:
                 try:
-                    elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                    elements = tree.css(selector)
                     if elements:
                         product_elements = elements
                         self.logger.info(f"Found {len(elements)} products with selector: {selector}")
@@ -178,140 +461,139 @@ class TikTokShopScraper:
                     
             if not product_elements:
                 self.logger.warning("No product elements found, trying page source parsing")
-                return self.parse_products_from_source(market)
+                return products, self.find_product_urls(market, tree)
                 
             # Extract product information
             for element in product_elements[:20]:  # Limit to first 20 products
                 try:
                     product = self.extract_product_info(element, market)
-                    if product and 'lancome' in product.name.lower():
+                    if product:
                         products.append(product)
                         self.logger.info(f"Found Lancôme product: {product.name}")
                 except Exception as e:
                     self.logger.debug(f"Failed to extract product info: {e}")
                     
         except Exception as e:
+            if DriverPool.is_driver_failure(e):
+                raise
             self.logger.error(f"Error searching products in {market}: {e}")
             
-        finally:
-            if self.driver:
-                self.driver.quit()
+        return products, product_urls
+        
+    def find_product_urls(self, market: str, tree: HTMLParser) -> List[str]:
+        """Collect product URLs linked from a parsed page"""
+        base_url = self.get_tiktok_shop_url(market)
+        product_urls = []
+        
+        for link in tree.css('a[href*="/product/"]'):
+            href = link.attributes.get('href')
+            if href:
+                if not href.startswith('http'):
+                    href = urljoin(base_url, href)
+                product_urls.append(href)
                 
-        return products
+        return product_urls
+        
+    async def parse_products_from_source(self, market: str, product_urls: List[str]) -> List[ProductInfo]:
+        """Visit product pages as fallback method, spread across the driver pool"""
+        product_urls = product_urls[:10]  # Limit to prevent timeout
+        results = await asyncio.gather(
+            *[self.read_product_page(market, url) for url in product_urls],
+            return_exceptions=True
+        )
         
-    def parse_products_from_source(self, market: str) -> List[ProductInfo]:
-        """Parse products from page source as fallback method"""
         products = []
+        for url, result in zip(product_urls, results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"Failed to read product page {url}: {result}")
+            elif result:
+                products.append(result)
+        return products
+        
+    async def read_product_page(self, market: str, url: str) -> Optional[ProductInfo]:
+        """Open one product page on a pooled driver"""
+        async with self.pool.acquire(market) as driver:
+            return await self.pool.run(self._read_product_page, market, url, driver)
+            
+    def _read_product_page(self, market: str, url: str, driver: webdriver.Chrome) -> Optional[ProductInfo]:
+        """Blocking part of the fallback product check, run on a pool worker thread"""
         try:
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            
-            # Look for links that might be product URLs
-            links = soup.find_all('a', href=True)
-            product_urls = []
-            
-            for link in links:
-                href = link.get('href')
-                if href and '/product/' in href:
-                    if not href.startswith('http'):
-                        href = urljoin(self.get_tiktok_shop_url(market), href)
-                    product_urls.append(href)
-                    
-            # Visit each product URL to get details
-            for url in product_urls[:10]:  # Limit to prevent timeout
-                try:
-                    self.driver.get(url)
-                    self.random_delay(2, 4)
-                    
-                    # Extract product name to check for Lancôme
-                    title_selectors = ['h1', '.product-title', '[data-testid*="title"]']
-                    product_name = ""
-                    
-                    for selector in title_selectors:
-                        try:
-                            title_element = self.driver.find_element(By.CSS_SELECTOR, selector)
-                            product_name = title_element.text.strip()
-                            break
-                        except:
-                            continue
-                            
-                    if product_name and 'lancome' in product_name.lower():
-                        product = ProductInfo(
-                            url=url,
-                            name=product_name,
-                            price="N/A",
-                            rating="N/A",
-                            review_count="N/A",
-                            brand="Lancôme",
-                            market=market
-                        )
-                        products.append(product)
-                        
-                except Exception as e:
-                    self.logger.debug(f"Failed to extract product from {url}: {e}")
-                    
+            self.random_delay(0.2, 0.6)
+            driver.get(url)
+            
+            # Extract product name to check for Lancôme
+            product_name = ""
+            try:
+                title_element = WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, self.selectors['product_title']))
+                )
+                product_name = title_element.text.strip()
+            except TimeoutException:
+                self.logger.debug(f"Product title not rendered for {url}")
+                
+            if self.is_target_brand(product_name):
+                return ProductInfo(
+                    url=url,
+                    name=product_name,
+                    price="N/A",
+                    rating="N/A",
+                    review_count="N/A",
+                    brand="Lancôme",
+                    market=market
+                )
+                
         except Exception as e:
-            self.logger.error(f"Error parsing products from source: {e}")
+            if DriverPool.is_driver_failure(e):
+                raise
+            self.logger.debug(f"Failed to extract product from {url}: {e}")
             
-        return products
+        return None
+        
+    def select_field(self, element, field: str, attribute: Optional[str] = None) -> Optional[str]:
+        """Return the text of the first element inside element matching any candidate for field
+        
+        The candidates are queried as one selector list, so the first match in
+        document order wins rather than the first candidate in list order.
+        """
+        match = element.css_first(self.selectors[field])
+        if match is not None:
+            # Collapse the whitespace selectolax keeps around nested inline tags and newlines
+            return (attribute and match.attributes.get(attribute)) or ' '.join(match.text(separator=' ').split())
+        return None
+        
+    @staticmethod
+    def fold_name(name: str) -> str:
+        """Casefold a name and strip accents, whether they are precomposed or combining marks"""
+        if not name.isascii():
+            name = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+        return name.casefold()
+        
+    def is_target_brand(self, name: str) -> bool:
+        """Check whether a product name mentions the target brand"""
+        return _TARGET_BRAND_FOLDED in self.fold_name(name)
         
     def extract_product_info(self, element, market: str) -> Optional[ProductInfo]:
-        """Extract product information from element"""
+        """Extract product information from a parsed product card of the target brand"""
         try:
-            # Try to find product URL
-            url = ""
-            if element.tag_name == 'a':
-                url = element.get_attribute('href')
-            else:
-                link = element.find_element(By.TAG_NAME, 'a')
-                url = link.get_attribute('href')
+            # Skip other brands before reading the rest of the card
+            name = self.select_field(element, 'product_name') or ""
+            if not self.is_target_brand(name):
+                return None
+                
+            link = element if element.tag == 'a' else element.css_first('a[href]')
+            url = link.attributes.get('href') if link is not None else None
+            if not url:
+                return None
                 
             if not url.startswith('http'):
                 url = urljoin(self.get_tiktok_shop_url(market), url)
                 
-            # Extract product name
-            name_selectors = ['.product-name', '.item-title', 'h3', 'h4']
-            name = ""
-            for selector in name_selectors:
-                try:
-                    name_element = element.find_element(By.CSS_SELECTOR, selector)
-                    name = name_element.text.strip()
-                    break
-                except:
-                    continue
-                    
-            # Extract price
-            price_selectors = ['.price', '.product-price', '.cost']
-            price = "N/A"
-            for selector in price_selectors:
-                try:
-                    price_element = element.find_element(By.CSS_SELECTOR, selector)
-                    price = price_element.text.strip()
-                    break
-                except:
-                    continue
-                    
-            # Extract rating and review count
-            rating = "N/A"
-            review_count = "N/A"
-            
-            try:
-                rating_element = element.find_element(By.CSS_SELECTOR, '.rating, .star-rating')
-                rating = rating_element.text.strip()
-            except:
-                pass
-                
-            try:
-                review_element = element.find_element(By.CSS_SELECTOR, '.review-count, .reviews')
-                review_count = review_element.text.strip()
-            except:
-                pass
-                
             return ProductInfo(
                 url=url,
                 name=name,
-                price=price,
-                rating=rating,
-                review_count=review_count,
+                price=self.select_field(element, 'product_price') or "N/A",
+                rating=self.select_field(element, 'product_rating') or "N/A",
+                review_count=self.select_field(element, 'product_review_count') or "N/A",
                 brand="Lancôme",
                 market=market
             )
@@ -320,42 +602,52 @@ class TikTokShopScraper:
             self.logger.debug(f"Failed to extract product info: {e}")
             return None
             
-    def scrape_product_reviews(self, product: ProductInfo) -> List[ReviewInfo]:
+    async def scrape_product_reviews(self, product: ProductInfo) -> List[ReviewInfo]:
         """Scrape reviews for a specific product"""
         self.logger.info(f"Scraping reviews for: {product.name}")
         
+        async with self.pool.acquire(product.market) as driver:
+            reviews = await self.pool.run(self._collect_reviews, product, driver)
+            
+            # Pace each browser between products without tying up a worker thread
+            await self.random_delay_async(5, 10)
+            
+        return reviews
+        
+    def _collect_reviews(self, product: ProductInfo, driver: webdriver.Chrome) -> List[ReviewInfo]:
+        """Blocking part of the review scrape, run on a pool worker thread"""
         reviews = []
-        self.driver = self.setup_driver(product.market)
         
         try:
-            self.driver.get(product.url)
-            self.random_delay(3, 5)
+            # Drivers are reused across products, so drop the previous product's session
+            driver.delete_all_cookies()
+            self.random_delay(0.2, 0.6)
+            driver.get(product.url)
             
             # Try to find reviews section
-            review_selectors = [
-                '.reviews-section',
-                '.review-list',
-                '[data-testid*="review"]',
-                '.comment-section'
-            ]
-            
             review_section = None
-            for selector in review_selectors:
-                try:
-                    review_section = self.driver.find_element(By.CSS_SELECTOR, selector)
-                    break
-                except:
-                    continue
-                    
+            try:
+                review_section = WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, self.selectors['reviews_section']))
+                )
+            except TimeoutException:
+                self.logger.debug(f"Review section not rendered for {product.url}")
+                
+            # Fast path: the page load has set up the session, so fetch reviews as JSON
+            reviews = self.fetch_reviews_from_api(product, driver)
+            if reviews:
+                return reviews
+                
             if not review_section:
                 self.logger.warning(f"No review section found for {product.url}")
                 return []
                 
             # Scroll to load more reviews
-            self.scroll_to_load_reviews()
+            self.scroll_to_load_reviews(driver)
             
-            # Extract individual reviews
-            review_elements = self.driver.find_elements(By.CSS_SELECTOR, '.review-item, .comment-item, .feedback-item')
+            # Parse the loaded reviews locally in one pass over the page source
+            tree = HTMLParser(driver.page_source)
+            review_elements = tree.css(self.selectors['review_items'])
             
             for element in review_elements:
                 review = self.extract_review_info(element, product)
@@ -363,35 +655,119 @@ class TikTokShopScraper:
                     reviews.append(review)
                     
         except Exception as e:
+            # Let driver failures reach the pool so it replaces the browser
+            if DriverPool.is_driver_failure(e):
+                raise
             self.logger.error(f"Error scraping reviews for {product.url}: {e}")
             
-        finally:
-            if self.driver:
-                self.driver.quit()
-                
         return reviews
         
-    def scroll_to_load_reviews(self):
+    def fetch_reviews_from_api(self, product: ProductInfo, driver: webdriver.Chrome,
+                               max_reviews: int = 100) -> List[ReviewInfo]:
+        """Page through the review endpoint with the browser's cookies, skipping DOM scraping"""
+        match = re.search(r'/product/(\d+)', product.url)
+        if not match:
+            return []
+            
+        api_url = urljoin(product.url, self.REVIEW_API_PATH)
+        cookies = {cookie['name']: cookie['value'] for cookie in driver.get_cookies()}
+        headers = {
+            'User-Agent': driver.execute_script("return navigator.userAgent"),
+            'Referer': product.url,
+            'Accept': 'application/json'
+        }
+        
+        reviews = []
+        cursor = 0
+        try:
+            # A session per product: this runs on several pool threads at once, and
+            # cookies set by one product's responses must not leak into another's
+            with requests.Session() as session:
+                while len(reviews) < max_reviews:
+                    response = session.get(
+                        api_url,
+                        params={'product_id': match.group(1), 'cursor': cursor, 'size': self.REVIEW_API_PAGE_SIZE},
+                        headers=headers,
+                        cookies=cookies,
+                        timeout=10
+                    )
+                    response.raise_for_status()
+                    
+                    data = response.json().get('data') or {}
+                    items = data.get('reviews') or []
+                    reviews.extend(self.extract_api_review_info(item, product) for item in items)
+                    
+                    if not items or not data.get('has_more'):
+                        break
+                    cursor = data.get('cursor', cursor + len(items))
+                    
+        except (requests.RequestException, ValueError, AttributeError) as e:
+            self.logger.debug(f"Review API unavailable for {product.url}: {e}")
+            
+        return reviews[:max_reviews]
+        
+    def extract_api_review_info(self, item: Dict, product: ProductInfo) -> ReviewInfo:
+        """Extract review information from a review API record"""
+        reviewer_name = intern_short(str(item.get('user_name') or item.get('nickname') or "Anonymous"))
+        review_text = str(item.get('content') or item.get('text') or "")
+        
+        review_date = "N/A"
+        if item.get('create_time'):
+            review_date = sys.intern(datetime.fromtimestamp(int(item['create_time'])).strftime('%Y-%m-%d'))
+            
+        review_id = item.get('review_id') or item.get('id')
+        if not review_id:
+            review_id = self.make_review_id(product, reviewer_name, review_text, review_date)
+            
+        return ReviewInfo(
+            product_url=product.url,
+            product_name=product.name,
+            reviewer_name=reviewer_name,
+            rating=intern_short(str(item.get('rating') or item.get('star') or "N/A")),
+            review_text=review_text,
+            review_date=review_date,
+            verified_purchase="Yes" if item.get('is_verified_purchase') else "N/A",
+            helpful_votes=intern_short(str(item.get('like_count') or item.get('helpful_count') or 0)),
+            review_id=str(review_id),
+            country_market=product.market,
+            scrape_timestamp=datetime.now().isoformat()
+        )
+        
+    def scroll_to_load_reviews(self, driver: webdriver.Chrome, max_reviews: int = 100):
         """Scroll page to trigger loading of more reviews"""
+        review_selector = json.dumps(self.selectors['review_items'])
+        count_script = f"return document.querySelectorAll({review_selector}).length"
+        scroll_script = f"window.scrollTo(0, document.body.scrollHeight); {count_script}"
+        
         try:
-            # Scroll down multiple times to load more content
-            for i in range(5):
-                self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                self.random_delay(2, 3)
+            # Poll with exponential backoff: back to 200 ms whenever new reviews
+            # appear, doubling up to 2 s while nothing changes, and stop after
+            # two quiet polls in a row
+            delay = 0.2
+            stable_polls = 0
+            previous_count = driver.execute_script(scroll_script)
+            while stable_polls < 2 and previous_count < max_reviews:
+                time.sleep(delay)
+                count = driver.execute_script(scroll_script)
+                if count == previous_count:
+                    stable_polls += 1
+                    delay = min(delay * 2, 2.0)
+                else:
+                    stable_polls = 0
+                    delay = 0.2
+                previous_count = count
                 
             # Try to click "Load More" buttons if they exist
-            load_more_selectors = [
-                '.load-more',
-                '.show-more',
-                'button[data-testid*="load"]'
-            ]
-            
-            for selector in load_more_selectors:
+            for selector in ScrapingConfig.SELECTORS['load_more_buttons']:
                 try:
-                    button = self.driver.find_element(By.CSS_SELECTOR, selector)
+                    button = driver.find_element(By.CSS_SELECTOR, selector)
                     if button.is_displayed() and button.is_enabled():
+                        review_count = driver.execute_script(count_script)
+                        self.random_delay(0.2, 0.6)
                         button.click()
-                        self.random_delay(2, 3)
+                        WebDriverWait(driver, 5).until(
+                            lambda d: d.execute_script(count_script) > review_count
+                        )
                 except:
                     continue
                     
@@ -399,65 +775,16 @@ class TikTokShopScraper:
             self.logger.debug(f"Error during scroll/load more: {e}")
             
     def extract_review_info(self, element, product: ProductInfo) -> Optional[ReviewInfo]:
-        """Extract review information from element"""
+        """Extract review information from a parsed review item"""
         try:
-            # Extract reviewer name
-            reviewer_name = "Anonymous"
-            name_selectors = ['.reviewer-name', '.username', '.author']
-            for selector in name_selectors:
-                try:
-                    name_element = element.find_element(By.CSS_SELECTOR, selector)
-                    reviewer_name = name_element.text.strip()
-                    break
-                except:
-                    continue
-                    
-            # Extract rating
-            rating = "N/A"
-            rating_selectors = ['.rating', '.star-rating', '.score']
-            for selector in rating_selectors:
-                try:
-                    rating_element = element.find_element(By.CSS_SELECTOR, selector)
-                    rating = rating_element.get_attribute('data-rating') or rating_element.text.strip()
-                    break
-                except:
-                    continue
-                    
-            # Extract review text
-            review_text = ""
-            text_selectors = ['.review-text', '.comment-text', '.content']
-            for selector in text_selectors:
-                try:
-                    text_element = element.find_element(By.CSS_SELECTOR, selector)
-                    review_text = text_element.text.strip()
-                    break
-                except:
-                    continue
-                    
-            # Extract date
-            review_date = "N/A"
-            date_selectors = ['.review-date', '.timestamp', '.date']
-            for selector in date_selectors:
-                try:
-                    date_element = element.find_element(By.CSS_SELECTOR, selector)
-                    review_date = date_element.text.strip()
-                    break
-                except:
-                    continue
-                    
-            # Extract helpful votes
-            helpful_votes = "0"
-            helpful_selectors = ['.helpful-count', '.likes', '.thumbs-up']
-            for selector in helpful_selectors:
-                try:
-                    helpful_element = element.find_element(By.CSS_SELECTOR, selector)
-                    helpful_votes = helpful_element.text.strip()
-                    break
-                except:
-                    continue
-                    
+            reviewer_name = intern_short(self.select_field(element, 'reviewer_name') or "Anonymous")
+            rating = intern_short(self.select_field(element, 'review_rating', attribute='data-rating') or "N/A")
+            review_text = self.select_field(element, 'review_text') or ""
+            review_date = intern_short(self.select_field(element, 'review_date') or "N/A")
+            helpful_votes = intern_short(self.select_field(element, 'helpful_votes') or "0")
+            
             # Generate review ID
-            review_id = f"{hash(reviewer_name + review_text + review_date) % 1000000}"
+            review_id = self.make_review_id(product, reviewer_name, review_text, review_date)
             
             return ReviewInfo(
                 product_url=product.url,
@@ -477,52 +804,135 @@ class TikTokShopScraper:
             self.logger.debug(f"Failed to extract review info: {e}")
             return None
             
+    def make_review_id(self, product: ProductInfo, reviewer_name: str, review_text: str, review_date: str) -> str:
+        """Generate a review ID that is stable across runs"""
+        # Hash the product URL once per product and extend a copy for each review
+        base = self.review_id_hashers.get(product.url)
+        if base is None:
+            base = hashlib.blake2b(product.url.encode('utf-8'), digest_size=8)
+            self.review_id_hashers[product.url] = base
+            
+        digest = base.copy()
+        digest.update('\x1f'.join(('', reviewer_name, review_text, review_date)).encode('utf-8'))
+        return digest.hexdigest()
+        
     def save_to_csv(self, reviews: List[ReviewInfo], filename: str):
         """Save reviews to CSV file"""
         try:
-            with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-                fieldnames = [
-                    'product_url', 'product_name', 'reviewer_name', 'rating',
-                    'review_text', 'review_date', 'verified_purchase',
-                    'helpful_votes', 'review_id', 'country_market', 'scrape_timestamp'
-                ]
-                
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
+            with ReviewCsvWriter(filename) as output:
+                output.write(reviews)
                 
-                for review in reviews:
-                    writer.writerow(asdict(review))
-                    
             self.logger.info(f"Saved {len(reviews)} reviews to {filename}")
             
         except Exception as e:
             self.logger.error(f"Error saving to CSV: {e}")
             
-    def run_complete_scraping(self) -> List[ReviewInfo]:
-        """Run complete scraping process for both markets"""
-        all_reviews = []
+    def run_markets_in_processes(self, filename: str, markets: Optional[List[str]] = None) -> int:
+        """Scrape each market in its own process and merge the results into one CSV"""
+        markets = markets or list(self.markets)
+        part_files = [f"{filename}.{market}.part" for market in markets]
+        counts = []
         
-        for market in ['vietnam', 'saudi_arabia']:
+        try:
+            # Spawn rather than fork so no child inherits a running Chrome or event loop
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(len(markets)) as process_pool:
+                results = [
+                    process_pool.apply_async(
+                        scrape_market_in_process,
+                        (market, part_file, self.headless, self.proxy, self.max_workers)
+                    )
+                    for market, part_file in zip(markets, part_files)
+                ]
+                # A failing market must not strand the parts the others finished
+                for market, result in zip(markets, results):
+                    try:
+                        counts.append(result.get())
+                    except Exception as e:
+                        self.logger.error(f"Error scraping {market}: {e}")
+                        
+            existing_parts = [part_file for part_file in part_files if os.path.exists(part_file)]
+            with open(filename, 'wb') as output:
+                if not existing_parts:
+                    output.write(','.join(CSV_FIELDNAMES).encode('utf-8') + b'\r\n')
+                for index, part_file in enumerate(existing_parts):
+                    with open(part_file, 'rb') as part:
+                        header = part.readline()
+                        if index == 0:
+                            output.write(header)
+                        shutil.copyfileobj(part, output, 1 << 20)
+        finally:
+            for part_file in part_files:
+                if os.path.exists(part_file):
+                    os.remove(part_file)
+                    
+        total = sum(counts)
+        self.logger.info(f"Merged {total} reviews from {len(markets)} markets into {filename}")
+        return total
+        
+    async def run_complete_scraping(self, filename: str, markets: Optional[List[str]] = None) -> int:
+        """Run complete scraping process for the given markets, streaming reviews to CSV"""
+        markets = markets or list(self.markets)
+        self.pool = DriverPool(self, self.max_workers)
+        
+        with ReviewCsvWriter(filename) as output:
             try:
-                self.logger.info(f"Starting scraping for {market}")
-                
-                # Step 1: Find Lancôme products
-                products = self.search_lancome_products(market)
-                self.logger.info(f"Found {len(products)} Lancôme products in {market}")
+                await self.pool.start(markets)
+                await asyncio.gather(
+                    *[self.scrape_market(market, output) for market in markets]
+                )
+            finally:
+                await self.pool.close()
+                self.pool = None
                 
-                # Step 2: Scrape reviews for each product
-                for product in products:
-                    reviews = self.scrape_product_reviews(product)
-                    all_reviews.extend(reviews)
-                    self.logger.info(f"Collected {len(reviews)} reviews for {product.name}")
-                    
-                    # Add delay between products
-                    self.random_delay(5, 10)
+        self.logger.info(f"Saved {output.count} reviews to {filename}")
+        return output.count
+        
+    async def scrape_market(self, market: str, output: ReviewCsvWriter) -> int:
+        """Find Lancôme products in one market and scrape their reviews concurrently"""
+        review_counts = []
+        
+        try:
+            self.logger.info(f"Starting scraping for {market}")
+            
+            # Step 1: Find Lancôme products
+            products = await self.search_lancome_products(market)
+            self.logger.info(f"Found {len(products)} Lancôme products in {market}")
+            
+            # Step 2: Scrape reviews for all products, bounded by the driver pool.
+            # A failing product must not abandon the others while the pool shuts down
+            results = await asyncio.gather(
+                *[self.scrape_and_save_reviews(product, output) for product in products],
+                return_exceptions=True
+            )
+            for product, result in zip(products, results):
+                if isinstance(result, BaseException):
+                    self.logger.error(f"Error scraping reviews for {product.url}: {result}")
+                else:
+                    review_counts.append(result)
                     
-            except Exception as e:
-                self.logger.error(f"Error scraping {market}: {e}")
-                
-        return all_reviews
+        except Exception as e:
+            self.logger.error(f"Error scraping {market}: {e}")
+            
+        return sum(review_counts)
+        
+    async def scrape_and_save_reviews(self, product: ProductInfo, output: ReviewCsvWriter) -> int:
+        """Scrape one product and write its reviews as soon as they are collected"""
+        reviews = await self.scrape_product_reviews(product)
+        output.write(reviews)
+        self.logger.info(f"Collected {len(reviews)} reviews for {product.name}")
+        return len(reviews)
+
+
+# Folded once, is_target_brand runs for every product card
+_TARGET_BRAND_FOLDED = TikTokShopScraper.fold_name(ScrapingConfig.TARGET_BRAND)
+
+
+def scrape_market_in_process(market: str, filename: str, headless: bool,
+                             proxy: Optional[str], max_workers: int) -> int:
+    """Process entry point: scrape a single market into its own CSV file"""
+    scraper = TikTokShopScraper(headless=headless, proxy=proxy, max_workers=max_workers)
+    return asyncio.run(scraper.run_complete_scraping(filename, markets=[market]))
 
 
 def main():
@@ -530,14 +940,12 @@ def main():
     scraper = TikTokShopScraper(headless=False)  # Set to True for production
     
     try:
-        # Run complete scraping
-        reviews = scraper.run_complete_scraping()
-        
-        # Save results
-        if reviews:
-            filename = "aymane_aallaoui_tiktok_shop_reviews_sample.csv"
-            scraper.save_to_csv(reviews, filename)
-            print(f"\nScraping completed! Found {len(reviews)} reviews total.")
+        # Run one process per market, results are written as each product finishes
+        filename = "aymane_aallaoui_tiktok_shop_reviews_sample.csv"
+        review_count = scraper.run_markets_in_processes(filename)
+        
+        if review_count:
+            print(f"\nScraping completed! Found {review_count} reviews total.")
             print(f"Results saved to {filename}")
         else:
             print("No reviews found. This might be due to:")
@@ -4,6 +4,7 @@ Configuration file for TikTok Shop scraper
 """
 
 import os
+import tempfile
 from dataclasses import dataclass
 from typing import Dict, List
 
@@ -50,6 +51,10 @@ class ScrapingConfig:
     OUTPUT_CSV = "aymane_aallaoui_tiktok_shop_reviews_sample.csv"
     LOG_FILE = "scraper.log"
     
+    # Browser profiles (kept between runs so static assets stay cached)
+    PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'tiktok-scraper-profiles')
+    DISK_CACHE_SIZE = 512 * 1024 * 1024  # 512 MB
+    
     # User agents for rotation
     USER_AGENTS = [
         'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -74,12 +79,26 @@ class ScrapingConfig:
             '[data-testid*="title"]',
             '.goods-title'
         ],
+        'product_name': [
+            '.product-name',
+            '.item-title',
+            'h3',
+            'h4'
+        ],
         'product_price': [
             '.price',
             '.product-price',
             '.cost',
             '[data-testid*="price"]'
         ],
+        'product_rating': [
+            '.rating',
+            '.star-rating'
+        ],
+        'product_review_count': [
+            '.review-count',
+            '.reviews'
+        ],
         'reviews_section': [
             '.reviews-section',
             '.review-list',
@@ -116,6 +135,11 @@ class ScrapingConfig:
             '.date',
             '[data-testid*="date"]'
         ],
+        'helpful_votes': [
+            '.helpful-count',
+            '.likes',
+            '.thumbs-up'
+        ],
         'load_more_buttons': [
             '.load-more',
             '.show-more',
@@ -134,7 +158,6 @@ class ScrapingConfig:
         '--disable-extensions',
         '--disable-plugins',
         '--disable-images',  # Faster loading
-        '--disable-javascript',  # May break some functionality
     ]
     
     # Rate limiting
@@ -176,11 +176,11 @@ def print_usage_instructions():
     print("\n1. Basic usage:")
     print("   python aymane_aallaoui_tiktok_shop_code.py")
     print("\n2. Development mode (visible browser):")
-    print("   python -c \"from aymane_aallaoui_tiktok_shop_code import TikTokShopScraper; TikTokShopScraper(headless=False).run_complete_scraping()\"")
+    print("   python -c \"import asyncio; from aymane_aallaoui_tiktok_shop_code import TikTokShopScraper; asyncio.run(TikTokShopScraper(headless=False).run_complete_scraping('reviews.csv'))\"")
     print("\n3. Custom configuration:")
     print("   Edit config.py or .env file")
     print("\n4. Test specific market:")
-    print("   python -c \"from aymane_aallaoui_tiktok_shop_code import TikTokShopScraper; scraper = TikTokShopScraper(); print(scraper.search_lancome_products('vietnam'))\"")
+    print("   python -c \"import asyncio; from aymane_aallaoui_tiktok_shop_code import TikTokShopScraper; print(asyncio.run(TikTokShopScraper().run_complete_scraping('vietnam_reviews.csv', markets=['vietnam'])))\"")
     print("\n📁 Output files will be saved as:")
     print("   - aymane_aallaoui_tiktok_shop_reviews_sample.csv")
     print("   - scraper.log")
@@ -5,12 +5,18 @@ Test cases for TikTok Shop Reviews Scraper
 
 import unittest
 import time
+import asyncio
 from unittest.mock import Mock, patch, MagicMock
 from selenium.webdriver.common.by import By
+from selenium.common.exceptions import InvalidSessionIdException, StaleElementReferenceException
+from selectolax.parser import HTMLParser
 
-from aymane_aallaoui_tiktok_shop_code import TikTokShopScraper, ProductInfo, ReviewInfo
+from aymane_aallaoui_tiktok_shop_code import TikTokShopScraper, DriverPool, ReviewCsvWriter, ProductInfo, ReviewInfo
 from config import get_config
-from utils import clean_text, normalize_rating, validate_review_data, deduplicate_reviews
+from utils import (
+    clean_text, normalize_rating, normalize_date, validate_review_data, deduplicate_reviews,
+    append_checkpoint, load_checkpoint
+)
 
 
 class TestUtilityFunctions(unittest.TestCase):
@@ -47,6 +53,16 @@ class TestUtilityFunctions(unittest.TestCase):
         self.assertEqual(normalize_rating(""), "N/A")
         self.assertEqual(normalize_rating("abc"), "abc")
     
+    def test_normalize_date(self):
+        """Test date normalization to ISO format"""
+        self.assertEqual(normalize_date("2024-08-15"), "2024-08-15")
+        self.assertEqual(normalize_date("08/15/2024"), "2024-08-15")
+        self.assertEqual(normalize_date("15.08.2024"), "2024-08-15")
+        
+        # Test unrecognized dates
+        self.assertEqual(normalize_date(""), "N/A")
+        self.assertEqual(normalize_date("2 days ago"), "2 days ago")
+    
     def test_validate_review_data(self):
         """Test review data validation"""
         # Valid review
@@ -96,6 +112,67 @@ class TestUtilityFunctions(unittest.TestCase):
         
         unique_reviews = deduplicate_reviews(reviews)
         self.assertEqual(len(unique_reviews), 2)
+    
+    def test_deduplicate_reviews_large_batch(self):
+        """Test deduplication of batches large enough to go through pandas"""
+        reviews = [
+            {'reviewer_name': f'User{i % 2500}', 'review_text': 'Great product!', 'product_url': 'https://example.com/1'}
+            for i in range(3000)
+        ]
+        
+        unique_reviews = deduplicate_reviews(reviews)
+        self.assertEqual(len(unique_reviews), 2500)
+        self.assertIs(unique_reviews[0], reviews[0])
+        self.assertNotIn('review_date', unique_reviews[0])
+    
+    def test_append_checkpoint(self):
+        """Test that appended checkpoints load back in order"""
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'checkpoint.jsonl')
+            append_checkpoint([{'reviewer_name': 'User1'}, {'reviewer_name': 'Người dùng'}], filename)
+            append_checkpoint([{'reviewer_name': 'User3'}], filename)
+            
+            self.assertEqual(
+                [review['reviewer_name'] for review in load_checkpoint(filename)],
+                ['User1', 'Người dùng', 'User3']
+            )
+    
+    def test_load_checkpoint_skips_truncated_last_line(self):
+        """Test that a cut-off last line does not lose the earlier reviews"""
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'checkpoint.jsonl')
+            append_checkpoint([{'reviewer_name': 'User1'}, {'reviewer_name': 'User2'}], filename)
+            with open(filename, 'ab') as f:
+                f.write(b'{"reviewer_name": "Us')
+            
+            self.assertEqual(
+                [review['reviewer_name'] for review in load_checkpoint(filename)],
+                ['User1', 'User2']
+            )
+    
+    def test_append_checkpoint_after_truncated_last_line(self):
+        """Test that appending after a crash mid-append keeps every complete review"""
+        import os
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'checkpoint.jsonl')
+            append_checkpoint([{'reviewer_name': 'User1'}], filename)
+            with open(filename, 'ab') as f:
+                f.write(b'{"reviewer_name": "Us')
+            append_checkpoint([{'reviewer_name': 'User3'}], filename)
+            append_checkpoint([{'reviewer_name': 'User4'}], filename)
+            
+            self.assertEqual(
+                [review['reviewer_name'] for review in load_checkpoint(filename)],
+                ['User1', 'User3', 'User4']
+            )
 
 
 class TestScraperConfiguration(unittest.TestCase):
@@ -163,10 +240,26 @@ class TestScraperCore(unittest.TestCase):
         self.assertGreaterEqual(delay, 0.1)
         self.assertLessEqual(delay, 0.3)  # Allow some tolerance
     
+    def test_random_delay_async(self):
+        """Test that the async delay lets other coroutines run meanwhile"""
+        async def delay_twice():
+            await asyncio.gather(
+                self.scraper.random_delay_async(0.1, 0.2),
+                self.scraper.random_delay_async(0.1, 0.2)
+            )
+        
+        start_time = time.time()
+        asyncio.run(delay_twice())
+        delay = time.time() - start_time
+        
+        self.assertGreaterEqual(delay, 0.1)
+        self.assertLessEqual(delay, 0.3)  # Both delays overlap
+    
     @patch('aymane_aallaoui_tiktok_shop_code.webdriver.Chrome')
     def test_setup_driver(self, mock_chrome):
         """Test driver setup"""
-        mock_driver = Mock()
+        mock_driver = MagicMock()
+        mock_driver.command_executor._conn.connection_pool_kw = {}
         mock_chrome.return_value = mock_driver
         
         driver = self.scraper.setup_driver('vietnam')
@@ -176,6 +269,124 @@ class TestScraperCore(unittest.TestCase):
         
         # Verify anti-detection script was executed
         mock_driver.execute_script.assert_called_once()
+        
+        # Verify heavy subresources are blocked through DevTools
+        mock_driver.execute_cdp_cmd.assert_any_call(
+            "Network.setBlockedURLs", {"urls": self.scraper.BLOCKED_URL_PATTERNS}
+        )
+        
+        # Verify the command connection pool was widened for concurrent use
+        self.assertGreaterEqual(mock_driver.command_executor._conn.connection_pool_kw['maxsize'], 10)
+
+
+class TestDriverPool(unittest.TestCase):
+    """Test driver pool reuse"""
+    
+    def setUp(self):
+        """Setup test environment"""
+        self.scraper = TikTokShopScraper(headless=True, max_workers=2)
+    
+    def test_driver_reused_between_acquires(self):
+        """Test that a released driver is handed out again instead of starting Chrome"""
+        mock_driver = Mock()
+        
+        async def borrow_twice():
+            pool = DriverPool(self.scraper, 2)
+            async with pool.acquire('vietnam') as first:
+                pass
+            async with pool.acquire('vietnam') as second:
+                pass
+            await pool.close()
+            return first, second
+        
+        with patch.object(self.scraper, 'setup_driver', return_value=mock_driver) as mock_setup:
+            first, second = asyncio.run(borrow_twice())
+        
+        self.assertIs(first, second)
+        mock_setup.assert_called_once_with('vietnam', 0)
+        mock_driver.quit.assert_called_once()
+    
+    def test_concurrent_drivers_get_separate_profiles(self):
+        """Test that drivers alive at the same time never share a profile slot"""
+        async def borrow_concurrently():
+            pool = DriverPool(self.scraper, 2)
+            async with pool.acquire('vietnam'):
+                async with pool.acquire('vietnam'):
+                    pass
+            await pool.close()
+        
+        with patch.object(self.scraper, 'setup_driver', side_effect=lambda market, slot: Mock()) as mock_setup:
+            asyncio.run(borrow_concurrently())
+        
+        slots = [call.args[1] for call in mock_setup.call_args_list]
+        self.assertEqual(sorted(slots), [0, 1])
+    
+    def test_pool_stays_within_size_across_markets(self):
+        """Test that launches in flight count against the size when markets compete"""
+        live = []
+        peak = []
+        
+        def setup_driver(market, slot):
+            driver = Mock()
+            driver.quit.side_effect = lambda: live.remove(driver)
+            live.append(driver)
+            peak.append(len(live))
+            time.sleep(0.01)
+            return driver
+        
+        async def borrow(pool, market):
+            async with pool.acquire(market):
+                await asyncio.sleep(0.001)
+                
+        async def borrow_mixed():
+            pool = DriverPool(self.scraper, 2)
+            await asyncio.gather(*[
+                borrow(pool, 'vietnam' if i % 3 else 'saudi_arabia') for i in range(30)
+            ])
+            await pool.close()
+        
+        with patch.object(self.scraper, 'setup_driver', side_effect=setup_driver):
+            asyncio.run(borrow_mixed())
+        
+        self.assertLessEqual(max(peak), 2)
+        self.assertEqual(live, [])
+    
+    def test_crashed_driver_is_replaced(self):
+        """Test that a driver whose session is gone is quit instead of reused"""
+        async def borrow_after_crash():
+            pool = DriverPool(self.scraper, 1)
+            with self.assertRaises(InvalidSessionIdException):
+                async with pool.acquire('vietnam') as first:
+                    raise InvalidSessionIdException("invalid session id")
+            async with pool.acquire('vietnam') as second:
+                pass
+            await pool.close()
+            return first, second
+        
+        with patch.object(self.scraper, 'setup_driver', side_effect=lambda market, slot: Mock()):
+            first, second = asyncio.run(borrow_after_crash())
+        
+        self.assertIsNot(first, second)
+        first.quit.assert_called_once()
+    
+    def test_page_error_keeps_driver(self):
+        """Test that a page-level error such as a stale element returns the driver to the pool"""
+        async def borrow_after_page_error():
+            pool = DriverPool(self.scraper, 1)
+            with self.assertRaises(StaleElementReferenceException):
+                async with pool.acquire('vietnam') as first:
+                    raise StaleElementReferenceException("stale element reference")
+            async with pool.acquire('vietnam') as second:
+                pass
+            quit_before_close = first.quit.called
+            await pool.close()
+            return first, second, quit_before_close
+        
+        with patch.object(self.scraper, 'setup_driver', side_effect=lambda market, slot: Mock()):
+            first, second, quit_before_close = asyncio.run(borrow_after_page_error())
+        
+        self.assertIs(first, second)
+        self.assertFalse(quit_before_close)
 
 
 class TestProductExtraction(unittest.TestCase):
@@ -187,29 +398,52 @@ class TestProductExtraction(unittest.TestCase):
     
     def test_extract_product_info(self):
         """Test product information extraction"""
-        # Create mock element
-        mock_element = Mock()
-        mock_element.tag_name = 'a'
-        mock_element.get_attribute.return_value = 'https://shop.tiktok.com/vn/product/123'
-        
-        # Mock child elements
-        mock_name_element = Mock()
-        mock_name_element.text = 'Lancôme Advanced Génifique'
-        
-        mock_price_element = Mock()
-        mock_price_element.text = '₫1,500,000'
-        
-        mock_element.find_element.side_effect = [
-            mock_name_element,  # First call for name
-            mock_price_element  # Second call for price
-        ]
+        # Parse a sample product card
+        html = """
+        <a class="product-card" href="/vn/product/123">
+            <h3>Lancôme Advanced Génifique</h3>
+            <span class="price">₫1,500,000</span>
+        </a>
+        """
+        element = HTMLParser(html).css_first('.product-card')
         
-        product = self.scraper.extract_product_info(mock_element, 'vietnam')
+        product = self.scraper.extract_product_info(element, 'vietnam')
         
         self.assertIsInstance(product, ProductInfo)
+        self.assertEqual(product.url, 'https://shop.tiktok.com/vn/product/123')
         self.assertEqual(product.name, 'Lancôme Advanced Génifique')
         self.assertEqual(product.price, '₫1,500,000')
+        self.assertEqual(product.rating, 'N/A')
         self.assertEqual(product.market, 'vietnam')
+    
+    def test_extract_product_info_without_link(self):
+        """Test that cards without a product link are skipped"""
+        element = HTMLParser('<div class="product-card"><h3>Lancôme</h3></div>').css_first('div')
+        product = self.scraper.extract_product_info(element, 'vietnam')
+        self.assertIsNone(product)
+    
+    def test_extract_product_info_other_brand(self):
+        """Test that cards of other brands are skipped"""
+        element = HTMLParser('<a class="product-card" href="/vn/product/9"><h3>Other Serum</h3></a>').css_first('a')
+        self.assertIsNone(self.scraper.extract_product_info(element, 'vietnam'))
+    
+    def test_is_target_brand(self):
+        """Test brand matching with and without the accent"""
+        self.assertTrue(self.scraper.is_target_brand('LANCÔME Advanced Génifique'))
+        self.assertTrue(self.scraper.is_target_brand('Lancome Idôle'))
+        self.assertTrue(self.scraper.is_target_brand('Lanco\u0302me Génifique'))
+        self.assertFalse(self.scraper.is_target_brand('Other Serum'))
+        self.assertFalse(self.scraper.is_target_brand(''))
+    
+    def test_find_product_urls(self):
+        """Test fallback product link collection from a parsed page"""
+        html = '<a href="/vn/product/1">A</a><a href="/vn/shop">B</a><a href="https://shop.tiktok.com/vn/product/2">C</a>'
+        urls = self.scraper.find_product_urls('vietnam', HTMLParser(html))
+        
+        self.assertEqual(urls, [
+            'https://shop.tiktok.com/vn/product/1',
+            'https://shop.tiktok.com/vn/product/2'
+        ])
 
 
 class TestReviewExtraction(unittest.TestCase):
@@ -230,50 +464,123 @@ class TestReviewExtraction(unittest.TestCase):
     
     def test_extract_review_info(self):
         """Test review information extraction"""
-        # Create mock review element
-        mock_element = Mock()
-        
-        # Mock sub-elements
-        mock_reviewer = Mock()
-        mock_reviewer.text = 'TestUser123'
-        
-        mock_rating = Mock()
-        mock_rating.get_attribute.return_value = '5'
-        mock_rating.text = '5 stars'
-        
-        mock_text = Mock()
-        mock_text.text = 'This is an amazing product! Highly recommend.'
-        
-        mock_date = Mock()
-        mock_date.text = '2024-08-15'
-        
-        mock_helpful = Mock()
-        mock_helpful.text = '12'
-        
-        # Setup find_element to return appropriate mocks
-        def mock_find_element(by, selector):
-            if 'reviewer-name' in selector or 'username' in selector:
-                return mock_reviewer
-            elif 'rating' in selector or 'star' in selector:
-                return mock_rating
-            elif 'review-text' in selector or 'comment-text' in selector:
-                return mock_text
-            elif 'review-date' in selector or 'timestamp' in selector:
-                return mock_date
-            elif 'helpful' in selector or 'likes' in selector:
-                return mock_helpful
-            else:
-                raise Exception("Element not found")
-        
-        mock_element.find_element.side_effect = mock_find_element
-        
-        review = self.scraper.extract_review_info(mock_element, self.sample_product)
+        # Parse a sample review item
+        html = """
+        <div class="review-item">
+            <span class="username">TestUser123</span>
+            <div class="star-rating" data-rating="5">5 stars</div>
+            <p class="review-text">This is an amazing product! Highly recommend.</p>
+            <span class="review-date">2024-08-15</span>
+            <span class="likes">12</span>
+        </div>
+        """
+        element = HTMLParser(html).css_first('.review-item')
+        
+        review = self.scraper.extract_review_info(element, self.sample_product)
         
         self.assertIsInstance(review, ReviewInfo)
         self.assertEqual(review.reviewer_name, 'TestUser123')
         self.assertEqual(review.rating, '5')
         self.assertEqual(review.review_text, 'This is an amazing product! Highly recommend.')
         self.assertEqual(review.product_name, 'Lancôme Test Product')
+    
+    def test_extract_review_info_defaults(self):
+        """Test defaults for fields missing from the review item"""
+        element = HTMLParser('<div class="review-item"><p class="content">Nice</p></div>').css_first('div')
+        review = self.scraper.extract_review_info(element, self.sample_product)
+        
+        self.assertEqual(review.reviewer_name, 'Anonymous')
+        self.assertEqual(review.rating, 'N/A')
+        self.assertEqual(review.helpful_votes, '0')
+    
+    def test_extract_review_info_collapses_whitespace(self):
+        """Test that text split across nested inline tags and newlines is joined cleanly"""
+        html = """
+        <div class="review-item">
+            <span class="username"> <b>Test</b>
+                <i>User</i> </span>
+            <p class="review-text"> <span>Great</span> <b>product</b>
+            </p>
+            <span class="review-date">  </span>
+        </div>
+        """
+        element = HTMLParser(html).css_first('.review-item')
+        review = self.scraper.extract_review_info(element, self.sample_product)
+        
+        self.assertEqual(review.reviewer_name, 'Test User')
+        self.assertEqual(review.review_text, 'Great product')
+        self.assertEqual(review.review_date, 'N/A')
+    
+    def test_extract_review_info_shares_repeated_values(self):
+        """Test that short repeated fields are interned and reviews carry no __dict__"""
+        html = '<div class="review-item"><span class="username">User</span><div class="rating" data-rating="5"></div></div>'
+        first = self.scraper.extract_review_info(HTMLParser(html).css_first('div'), self.sample_product)
+        second = self.scraper.extract_review_info(HTMLParser(html).css_first('div'), self.sample_product)
+        
+        self.assertIs(first.reviewer_name, second.reviewer_name)
+        self.assertIs(first.rating, second.rating)
+        self.assertFalse(hasattr(first, '__dict__'))
+        
+    @patch('aymane_aallaoui_tiktok_shop_code.time.sleep')
+    def test_scroll_backs_off_until_reviews_stop_loading(self, mock_sleep):
+        """Test that scrolling stops after two polls without new reviews"""
+        mock_driver = Mock()
+        mock_driver.execute_script.side_effect = [5, 10, 10, 10]
+        mock_driver.find_element.side_effect = Exception("Element not found")
+        
+        self.scraper.scroll_to_load_reviews(mock_driver)
+        
+        self.assertEqual([call.args[0] for call in mock_sleep.call_args_list], [0.2, 0.2, 0.4])
+    
+    def test_make_review_id(self):
+        """Test review IDs are stable and scoped to the product"""
+        review_id = self.scraper.make_review_id(self.sample_product, 'User1', 'Great product!', '2024-08-01')
+        
+        self.assertEqual(len(review_id), 16)
+        self.assertEqual(review_id, self.scraper.make_review_id(self.sample_product, 'User1', 'Great product!', '2024-08-01'))
+        self.assertEqual(review_id, TikTokShopScraper().make_review_id(self.sample_product, 'User1', 'Great product!', '2024-08-01'))
+        
+        other_product = ProductInfo(
+            url='https://shop.tiktok.com/vn/product/456',
+            name='Lancôme Other Product',
+            price='N/A',
+            rating='N/A',
+            review_count='N/A',
+            brand='Lancôme',
+            market='vietnam'
+        )
+        self.assertNotEqual(review_id, self.scraper.make_review_id(other_product, 'User1', 'Great product!', '2024-08-01'))
+    
+    def test_fetch_reviews_from_api(self):
+        """Test review collection through the JSON endpoint"""
+        mock_driver = Mock()
+        mock_driver.get_cookies.return_value = [{'name': 'sid', 'value': 'abc'}]
+        mock_driver.execute_script.return_value = 'Mozilla/5.0'
+        
+        mock_response = Mock()
+        mock_response.json.return_value = {
+            'data': {
+                'reviews': [
+                    {'review_id': 'r1', 'user_name': 'TestUser', 'rating': 5, 'content': 'Love it'},
+                    {'review_id': 'r2', 'nickname': 'Other', 'rating': 4, 'content': 'Good'}
+                ],
+                'has_more': False
+            }
+        }
+        
+        with patch('aymane_aallaoui_tiktok_shop_code.requests.Session') as mock_session_class, \
+                patch.object(self.scraper.session, 'get') as shared_get:
+            mock_get = mock_session_class.return_value.__enter__.return_value.get
+            mock_get.return_value = mock_response
+            reviews = self.scraper.fetch_reviews_from_api(self.sample_product, mock_driver)
+            
+        shared_get.assert_not_called()
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args.kwargs['params']['product_id'], '123')
+        self.assertEqual(mock_get.call_args.kwargs['cookies'], {'sid': 'abc'})
+        self.assertEqual([review.review_id for review in reviews], ['r1', 'r2'])
+        self.assertEqual(reviews[0].rating, '5')
+        self.assertEqual(reviews[1].reviewer_name, 'Other')
 
 
 class TestIntegration(unittest.TestCase):
@@ -330,7 +637,126 @@ class TestIntegration(unittest.TestCase):
             # Cleanup
             if os.path.exists(tmp_filename):
                 os.unlink(tmp_filename)
-
+    
+    def test_review_csv_writer_appends_batches(self):
+        """Test that reviews written per product all land in one CSV"""
+        import tempfile
+        import os
+        import csv
+        
+        def make_review(review_id):
+            return ReviewInfo(
+                product_url='https://shop.tiktok.com/vn/product/123',
+                product_name='Test Product',
+                reviewer_name='TestUser',
+                rating='5',
+                review_text='Great product!',
+                review_date='2024-08-15',
+                verified_purchase='N/A',
+                helpful_votes='0',
+                review_id=review_id,
+                country_market='vietnam',
+                scrape_timestamp='2024-08-21T10:00:00'
+            )
+        
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.csv') as tmp_file:
+            tmp_filename = tmp_file.name
+        
+        try:
+            with ReviewCsvWriter(tmp_filename, fsync_every=1) as output:
+                output.write([make_review('a'), make_review('b')])
+                output.write([])
+                output.write([make_review('c')])
+            
+            with open(tmp_filename, 'r', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            
+            self.assertEqual(output.count, 3)
+            self.assertEqual([row['review_id'] for row in rows], ['a', 'b', 'c'])
+            
+        finally:
+            if os.path.exists(tmp_filename):
+                os.unlink(tmp_filename)
+    
+    def run_markets_inline(self, fake_scrape_market, filename):
+        """Run run_markets_in_processes with each market scraped in this process"""
+        class InlineResult:
+            def __init__(self, func, args):
+                try:
+                    self.value, self.error = func(*args), None
+                except Exception as e:
+                    self.value, self.error = None, e
+            def get(self):
+                if self.error is not None:
+                    raise self.error
+                return self.value
+        
+        class InlinePool:
+            def __init__(self, processes):
+                pass
+            def __enter__(self):
+                return self
+            def __exit__(self, *args):
+                return False
+            def apply_async(self, func, args):
+                return InlineResult(func, args)
+        
+        mock_context = Mock()
+        mock_context.Pool = InlinePool
+        
+        with patch('aymane_aallaoui_tiktok_shop_code.multiprocessing.get_context', return_value=mock_context), \
+                patch('aymane_aallaoui_tiktok_shop_code.scrape_market_in_process', fake_scrape_market):
+            return self.scraper.run_markets_in_processes(filename)
+    
+    def test_run_markets_in_processes_merges_parts(self):
+        """Test that per-market CSV parts are merged under a single header"""
+        import tempfile
+        import os
+        import csv
+        
+        def fake_scrape_market(market, filename, headless, proxy, max_workers):
+            with open(filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['review_id', 'country_market'])
+                writer.writerow([f'{market}-1', market])
+            return 1
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'reviews.csv')
+            total = self.run_markets_inline(fake_scrape_market, filename)
+            
+            with open(filename, 'r', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            
+            self.assertEqual(total, 2)
+            self.assertEqual([row['review_id'] for row in rows], ['vietnam-1', 'saudi_arabia-1'])
+            self.assertEqual(os.listdir(tmp_dir), ['reviews.csv'])
+    
+    def test_run_markets_in_processes_survives_failed_market(self):
+        """Test that a market failing in its process does not lose the other markets' parts"""
+        import tempfile
+        import os
+        import csv
+        
+        def fake_scrape_market(market, filename, headless, proxy, max_workers):
+            if market == 'vietnam':
+                raise RuntimeError("driver pool failed to start")
+            with open(filename, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['review_id', 'country_market'])
+                writer.writerow([f'{market}-1', market])
+            return 1
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'reviews.csv')
+            total = self.run_markets_inline(fake_scrape_market, filename)
+            
+            with open(filename, 'r', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            
+            self.assertEqual(total, 1)
+            self.assertEqual([row['review_id'] for row in rows], ['saudi_arabia-1'])
+            self.assertEqual(os.listdir(tmp_dir), ['reviews.csv'])
 
 def run_manual_tests():
     """Run manual tests that require user interaction"""
@@ -4,27 +4,69 @@ Utility functions for TikTok Shop scraper
 """
 
 import re
+import asyncio
 import time
 import random
+import string
+import sys
+import threading
 import hashlib
+from functools import lru_cache, wraps
+from itertools import compress
 from datetime import datetime
 from typing import Optional, List, Dict
 from urllib.parse import urlparse, urljoin
 
+try:
+    import orjson
+except ImportError:  # Checkpoints fall back to the json module
+    orjson = None
+
+# Map every whitespace character (the last one is U+3000) to a plain space
+# and double quotes for CSV in a single translate pass
+_TRANSLATE = str.maketrans({
+    **dict.fromkeys((c for c in map(chr, range(0x3001)) if c.isspace()), ' '),
+    '"': '""'
+})
+_MULTI_SPACE = re.compile(r' {2,}')
+
+
+class _NumberFilter(dict):
+    """Translate table keeping decimal digits (any script), dots and commas
+    
+    Entries are filled in as characters are first seen instead of covering
+    all of Unicode up front.
+    """
+    
+    def __missing__(self, codepoint: int) -> Optional[int]:
+        char = chr(codepoint)
+        keep = codepoint if char.isdecimal() or char in '.,' else None
+        self[codepoint] = keep
+        return keep
+
+
+_NUMBER_FILTER = _NumberFilter()
+
+# Common date patterns as one alternation, the named group tells which matched
+_DATE_ALT = re.compile(
+    r'(?P<iso>(\d{4})-(\d{2})-(\d{2}))'     # YYYY-MM-DD, groups 2-4
+    r'|(?P<us>(\d{2})/(\d{2})/(\d{4}))'     # MM/DD/YYYY, groups 6-8
+    r'|(?P<eu>(\d{2})\.(\d{2})\.(\d{4}))'  # DD.MM.YYYY, groups 10-12
+)
+# Year, month and day group numbers for each format
+_DATE_GROUPS = {'iso': (2, 3, 4), 'us': (8, 6, 7), 'eu': (12, 11, 10)}
+
 
 def clean_text(text: str) -> str:
     """Clean and normalize text content"""
     if not text:
         return ""
     
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    # Remove special characters that might cause CSV issues
-    text = text.replace('"', '""')  # Escape quotes for CSV
-    text = re.sub(r'[\r\n]+', ' ', text)  # Replace newlines with spaces
+    # Turn newlines and other whitespace into spaces and escape quotes for CSV
+    text = text.translate(_TRANSLATE).strip()
     
-    return text
+    # Remove extra whitespace
+    return _MULTI_SPACE.sub(' ', text)
 
 
 def extract_number_from_text(text: str) -> Optional[float]:
@@ -33,7 +75,7 @@ def extract_number_from_text(text: str) -> Optional[float]:
         return None
         
     # Remove common currency symbols and text
-    cleaned = re.sub(r'[^\d.,]', '', text)
+    cleaned = text.translate(_NUMBER_FILTER)
     
     try:
         # Handle different decimal separators
@@ -49,6 +91,7 @@ def extract_number_from_text(text: str) -> Optional[float]:
         return None
 
 
+@lru_cache(maxsize=4096)
 def normalize_rating(rating_text: str) -> str:
     """Normalize rating to standard format"""
     if not rating_text:
@@ -56,58 +99,68 @@ def normalize_rating(rating_text: str) -> str:
         
     # Extract numeric rating
     number = extract_number_from_text(rating_text)
+    # Ratings take a handful of values, intern them so every row shares one string
     if number is not None:
-        return str(round(number, 1))
+        return sys.intern(str(round(number, 1)))
         
     # Handle star ratings
     star_count = rating_text.count('★') + rating_text.count('⭐')
     if star_count > 0:
-        return str(star_count)
+        return sys.intern(str(star_count))
         
     return rating_text
 
 
+@lru_cache(maxsize=4096)
 def normalize_date(date_text: str) -> str:
     """Normalize date to ISO format if possible"""
     if not date_text:
         return "N/A"
         
-    # Common date patterns
-    patterns = [
-        r'(\d{4})-(\d{2})-(\d{2})',  # YYYY-MM-DD
-        r'(\d{2})/(\d{2})/(\d{4})',  # MM/DD/YYYY
-        r'(\d{2})\.(\d{2})\.(\d{4})', # DD.MM.YYYY
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, date_text)
-        if match:
-            try:
-                if 'YYYY-MM-DD' in pattern:
-                    return f"{match.group(1)}-{match.group(2)}-{match.group(3)}"
-                elif 'MM/DD/YYYY' in pattern:
-                    return f"{match.group(3)}-{match.group(1).zfill(2)}-{match.group(2).zfill(2)}"
-                elif 'DD.MM.YYYY' in pattern:
-                    return f"{match.group(3)}-{match.group(2).zfill(2)}-{match.group(1).zfill(2)}"
-            except:
-                continue
-                
-    return date_text
+    match = _DATE_ALT.search(date_text)
+    if not match:
+        return date_text
+        
+    return '-'.join(match.group(*_DATE_GROUPS[match.lastgroup]))
 
 
 def generate_review_id(reviewer_name: str, review_text: str, date: str, product_url: str) -> str:
     """Generate unique review ID"""
-    content = f"{reviewer_name}{review_text}{date}{product_url}"
-    return hashlib.md5(content.encode()).hexdigest()[:12]
+    # Separate the fields so that shifting text between them changes the ID
+    content = '\x1f'.join((reviewer_name, review_text, date, product_url))
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=6).hexdigest()
+
+
+# Characters a host can start with for the is_valid_url fast path
+_HOST_START = frozenset(string.ascii_letters + string.digits)
+
+# URLs already found valid. Only positive results are kept, and only up to a
+# fixed size, so junk input cannot grow or poison the cache
+_VALID_URLS = set()
+_VALID_URLS_MAX = 4096
 
 
 def is_valid_url(url: str) -> bool:
     """Check if URL is valid"""
+    if not url:
+        return False
+    if url in _VALID_URLS:
+        return True
+        
+    # Common case: a plain ASCII http(s) URL with a host, no need to split it
+    start = 8 if url.startswith('https://') else 7 if url.startswith('http://') else 0
+    if start and url[start:start + 1] in _HOST_START and url.isascii() and '[' not in url and ']' not in url:
+        return True
+        
     try:
         result = urlparse(url)
-        return all([result.scheme, result.netloc])
-    except:
+        valid = bool(result.scheme and result.netloc)
+    except ValueError:
         return False
+        
+    if valid and len(_VALID_URLS) < _VALID_URLS_MAX:
+        _VALID_URLS.add(url)
+    return valid
 
 
 def make_absolute_url(base_url: str, relative_url: str) -> str:
@@ -117,61 +170,91 @@ def make_absolute_url(base_url: str, relative_url: str) -> str:
     return urljoin(base_url, relative_url)
 
 
+_tls = threading.local()
+
+
+def _rng() -> random.Random:
+    """Per-thread random generator, so worker threads never share one state"""
+    rng = getattr(_tls, 'rng', None)
+    if rng is None:
+        rng = _tls.rng = random.Random()
+    return rng
+
+
 def random_delay(min_seconds: float = 1.0, max_seconds: float = 3.0):
     """Add random delay"""
-    delay = random.uniform(min_seconds, max_seconds)
+    delay = _rng().uniform(min_seconds, max_seconds)
     time.sleep(delay)
 
 
+async def random_delay_async(min_seconds: float = 1.0, max_seconds: float = 3.0):
+    """Add random delay without blocking the event loop, prefer this in coroutines"""
+    await asyncio.sleep(_rng().uniform(min_seconds, max_seconds))
+
+
+_USER_AGENTS = tuple(map(sys.intern, (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/120.0',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/120.0'
+)))
+
+
 def get_random_user_agent() -> str:
     """Get random user agent string"""
-    user_agents = [
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/120.0',
-        'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:109.0) Gecko/20100101 Firefox/120.0'
-    ]
-    return random.choice(user_agents)
+    return _rng().choice(_USER_AGENTS)
 
 
 def validate_review_data(review_data: Dict) -> bool:
     """Validate review data quality"""
-    required_fields = ['product_url', 'reviewer_name', 'review_text']
+    product_url = review_data.get('product_url')
+    reviewer_name = review_data.get('reviewer_name')
+    review_text = review_data.get('review_text')
     
     # Check required fields
-    for field in required_fields:
-        if not review_data.get(field):
-            return False
-            
-    # Validate review text length
-    review_text = review_data.get('review_text', '')
-    if len(review_text) < 10 or len(review_text) > 5000:
+    if not (product_url and reviewer_name and review_text):
         return False
         
-    # Validate URL
-    if not is_valid_url(review_data.get('product_url', '')):
+    # Validate review text length
+    if not 10 <= len(review_text) <= 5000:
         return False
         
-    return True
+    # Validate URL last, it is the most expensive check
+    return is_valid_url(product_url)
+
+
+_DEDUP_FIELDS = ['reviewer_name', 'review_text', 'review_date', 'product_url']
+
+# Above this many reviews, building a DataFrame costs less than the Python loop.
+# Large batches are not split across worker processes: pickling the reviews
+# out and back costs more than the hashing that would be parallelized.
+_PANDAS_DEDUP_MIN = 2000
 
 
 def deduplicate_reviews(reviews: List[Dict]) -> List[Dict]:
     """Remove duplicate reviews based on content similarity"""
+    if len(reviews) > _PANDAS_DEDUP_MIN:
+        import pandas as pd
+        
+        # Only the key columns are loaded, the original dicts are returned as-is
+        keys = pd.DataFrame(reviews, columns=_DEDUP_FIELDS).fillna('')
+        return list(compress(reviews, ~keys.duplicated(keep='first').to_numpy()))
+        
     seen_reviews = set()
     unique_reviews = []
     
     for review in reviews:
-        # Create a hash based on key fields
-        review_hash = generate_review_id(
+        # Compare the key fields directly, tuples of strings hash cheaply
+        review_key = (
             review.get('reviewer_name', ''),
             review.get('review_text', ''),
             review.get('review_date', ''),
             review.get('product_url', '')
         )
         
-        if review_hash not in seen_reviews:
-            seen_reviews.add(review_hash)
+        if review_key not in seen_reviews:
+            seen_reviews.add(review_key)
             unique_reviews.append(review)
             
     return unique_reviews
@@ -181,55 +264,71 @@ def create_progress_tracker():
     """Create a simple progress tracker"""
     class ProgressTracker:
         def __init__(self):
-            self.start_time = time.time()
+            self.start_time = time.monotonic()
             self.total_products = 0
             self.processed_products = 0
             self.total_reviews = 0
+            self._last_stats = None
+            self._last_t = 0.0
             
         def update_products(self, total: int, processed: int):
             self.total_products = total
             self.processed_products = processed
+            self._last_stats = None
             
         def add_reviews(self, count: int):
             self.total_reviews += count
+            self._last_stats = None
             
         def get_stats(self) -> Dict:
-            elapsed = time.time() - self.start_time
-            return {
+            # Reuse the last stats while the counts are unchanged and they
+            # are under 100 ms old, progress displays poll this constantly
+            now = time.monotonic()
+            if self._last_stats is not None and now - self._last_t < 0.1:
+                return self._last_stats
+                
+            elapsed = now - self.start_time
+            self._last_stats = {
                 'elapsed_minutes': round(elapsed / 60, 2),
                 'products_processed': self.processed_products,
                 'total_products': self.total_products,
                 'total_reviews': self.total_reviews,
                 'avg_reviews_per_product': round(self.total_reviews / max(self.processed_products, 1), 2)
             }
+            self._last_t = now
+            return self._last_stats
             
     return ProgressTracker()
 
 
+# Exponential backoff before each retry, the call is attempted once more than this
+_RETRY_DELAYS = (5.0, 10.0)
+
+
 def handle_rate_limiting(func):
     """Decorator for handling rate limiting"""
+    max_retries = len(_RETRY_DELAYS) + 1
+    
+    @wraps(func)
     def wrapper(*args, **kwargs):
-        max_retries = 3
-        base_delay = 5
-        
-        for attempt in range(max_retries):
+        for attempt, base_delay in enumerate(_RETRY_DELAYS, 1):
             try:
                 return func(*args, **kwargs)
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise e
-                    
-                # Exponential backoff
-                delay = base_delay * (2 ** attempt) + random.uniform(0, 1)
-                print(f"Rate limited, waiting {delay:.1f} seconds before retry {attempt + 1}/{max_retries}")
+            except Exception:
+                delay = base_delay + _rng().random()
+                print(f"Rate limited, waiting {delay:.1f} seconds before retry {attempt}/{max_retries}")
                 time.sleep(delay)
                 
+        # Last attempt, its exception propagates
+        return func(*args, **kwargs)
+        
     return wrapper
 
 
 def save_checkpoint(data: List[Dict], filename: str = "checkpoint.json"):
     """Save progress checkpoint"""
     import json
+    import os
     
     checkpoint = {
         'timestamp': datetime.now().isoformat(),
@@ -238,26 +337,92 @@ def save_checkpoint(data: List[Dict], filename: str = "checkpoint.json"):
     }
     
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        # Serialize in one go instead of many small writes
+        if orjson is not None:
+            buf = orjson.dumps(checkpoint, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            buf = json.dumps(checkpoint, ensure_ascii=False, indent=2).encode('utf-8')
+            
+        # Write next to the target and rename over it, so a crash mid-write
+        # never leaves a truncated checkpoint behind
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'wb', buffering=1 << 20) as f:
+            f.write(buf)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
         print(f"Checkpoint saved: {len(data)} reviews")
     except Exception as e:
         print(f"Failed to save checkpoint: {e}")
 
 
+def append_checkpoint(new_items: List[Dict], filename: str = "checkpoint.jsonl"):
+    """Append new reviews to a JSON lines checkpoint without rewriting earlier ones"""
+    import json
+    import mmap
+    import os
+    
+    try:
+        if orjson is not None:
+            lines = [orjson.dumps(item, option=orjson.OPT_NON_STR_KEYS) for item in new_items]
+        else:
+            lines = [json.dumps(item, ensure_ascii=False).encode('utf-8') for item in new_items]
+            
+        with open(filename, 'a+b', buffering=1 << 20) as f:
+            # A crash mid-append leaves a partial last line, cut it off so the
+            # new lines do not get glued onto it
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    keep = size if mm[-1:] == b'\n' else mm.rfind(b'\n') + 1
+                if keep < size:
+                    print(f"Dropping truncated last checkpoint line ({size - keep} bytes)")
+                    f.truncate(keep)
+                    
+            for line in lines:
+                f.write(line + b'\n')
+        print(f"Checkpoint appended: {len(new_items)} reviews")
+    except Exception as e:
+        print(f"Failed to append checkpoint: {e}")
+
+
 def load_checkpoint(filename: str = "checkpoint.json") -> List[Dict]:
-    """Load progress checkpoint"""
+    """Load progress checkpoint, either a full dump or an appended .jsonl file"""
     import json
+    import mmap
     import os
     
     if not os.path.exists(filename):
         return []
         
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            checkpoint = json.load(f)
-        print(f"Checkpoint loaded: {len(checkpoint.get('data', []))} reviews")
-        return checkpoint.get('data', [])
+        # Nothing to load, and an empty file cannot be mapped
+        if os.path.getsize(filename) == 0:
+            return []
+            
+        # Parse straight from the mapped file instead of reading it into a str first
+        with open(filename, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if filename.endswith('.jsonl'):
+                loads = orjson.loads if orjson is not None else json.loads
+                data = []
+                for number, line in enumerate(iter(mm.readline, b''), 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        data.append(loads(line))
+                    except ValueError as e:
+                        # Keep every other review rather than losing the whole checkpoint
+                        print(f"Skipping corrupt checkpoint line {number}: {e}")
+            else:
+                if orjson is not None:
+                    with memoryview(mm) as view:
+                        checkpoint = orjson.loads(view)
+                else:
+                    checkpoint = json.loads(mm[:])
+                data = checkpoint.get('data', [])
+                
+        print(f"Checkpoint loaded: {len(data)} reviews")
+        return data
     except Exception as e:
         print(f"Failed to load checkpoint: {e}")
         return []